@@ -5,51 +5,296 @@ Enhanced with Google Maps API integration for address verification and navigatio
 """
 
 import asyncio
+import logging
 import os
+import random
+import re
+import sqlite3
+import threading
+import time
 import urllib.parse
-from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Any, Tuple
-from dataclasses import dataclass
-from enum import Enum
-import base64
+from typing import Optional, Dict, List, Any, NamedTuple, Tuple
+from dataclasses import dataclass, field, fields
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
 import json
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
-from groq import AsyncGroq
-
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class NavigationIssueType(IntEnum):
+    INCORRECT_ADDRESS = 1
+    GPS_APP_CRASH = 2
+    LOCATION_DIFFICULTY = 3
+
+
+# Stable string labels for logging and serialization; the enum values themselves are ints
+NAVIGATION_ISSUE_LABELS = MappingProxyType({
+    NavigationIssueType.INCORRECT_ADDRESS: "incorrect_customer_address",
+    NavigationIssueType.GPS_APP_CRASH: "gps_app_technical_failure",
+    NavigationIssueType.LOCATION_DIFFICULTY: "customer_location_finding_difficulty"
+})
+
+
+class AddressIssueType(IntEnum):
+    WRONG_PIN_CODE = 1
+    MISSING_DETAILS = 2
+    INVALID_LOCATION = 3
+    OUTDATED_INFO = 4
+
+
+class GPSIssueType(IntEnum):
+    GPS_MALFUNCTION = 1
+    APP_CRASH = 2
+    NETWORK_CONNECTIVITY = 3
+    MAP_DATA_CORRUPT = 4
+
+
+class LocationDifficultyType(IntEnum):
+    GATED_SOCIETY = 1
+    MISSING_LANDMARKS = 2
+    COMPLEX_BUILDING = 3
+    RURAL_AREA = 4
+
+
+# Location extraction patterns, compiled once at import time
+_CURRENT_LOC_RES = [
+    re.compile(r'(?:from|currently at|at|starting from)\s+([^,]+(?:,\s*[^,]+)*)', re.IGNORECASE),
+    re.compile(r'(?:my location is|i am at|im at)\s+([^,]+(?:,\s*[^,]+)*)', re.IGNORECASE)
+]
+
+_DEST_RES = [
+    re.compile(r'(?:to|going to|destination|deliver to)\s+([^,]+(?:,\s*[^,]+)*)', re.IGNORECASE),
+    re.compile(r'(?:customer at|address is|location is)\s+([^,]+(?:,\s*[^,]+)*)', re.IGNORECASE)
+]
+
+# Keyword buckets for handle_navigation_issues. Single words are matched against the
+# query's word set; the few multi-word phrases still need a substring check.
+_QUERY_WORD_RE = re.compile(r'\w+')
+_TRAFFIC_KEYWORDS = frozenset({'stuck', 'traffic', 'reroute', 'rerouting', 'rerouted'})
+_TRAFFIC_PHRASES = ('alternative route',)
+_ADDRESS_KEYWORDS = frozenset({'address', 'addresses'})
+_ADDRESS_PHRASES = ('find location',)
+_GPS_KEYWORDS = frozenset({'gps', 'maps'})
+_GPS_PHRASES = ('navigation not working',)
+
+# Orders database, resolved once at import; GRABHACK_DB_PATH overrides the usual locations
+_DATABASE_PATHS = [
+    'grabhack.db',
+    '../grabhack.db',
+    'GrabHack/grabhack.db',
+    os.path.join(os.path.dirname(__file__), '../../grabhack.db')
+]
+
+_DB_PATH = os.getenv('GRABHACK_DB_PATH') or next((path for path in _DATABASE_PATHS if os.path.exists(path)), None)
+
+# Order lookup used by _get_order_details_from_query; selects only what _resolve_locations reads
+_ORDER_ID_RE = re.compile(r'order[\s#]*([A-Z]{1,2}\d{3,4})', re.IGNORECASE)
+
+_ORDER_SQL = '''
+    SELECT id, start_address, end_address, restaurant_name
+    FROM orders
+    WHERE id = ? AND service = 'grab_food'
+'''
+
+
+# One read-only connection per thread; sqlite3 connections must not be shared across threads
+_db_local = threading.local()
+
+# Geocode results are reused for an hour; failures only briefly so transient API errors recover
+_ADDRESS_CACHE_TTL = 3600  # seconds
+_ADDRESS_NEGATIVE_CACHE_TTL = 60  # seconds
+_DIRECTIONS_CACHE_TTL = 300  # seconds; routes depend on live traffic
+
+# Successful geocodes also persist next to the orders database so restarts keep them;
+# GRABHACK_GEOCODE_CACHE_PATH overrides the location
+_GEOCODE_DISK_CACHE_TTL = 30 * 24 * 3600  # seconds
+_GEOCODE_CACHE_PATH = os.getenv('GRABHACK_GEOCODE_CACHE_PATH') or (
+    os.path.join(os.path.dirname(os.path.abspath(_DB_PATH)), 'geocode_cache.db') if _DB_PATH else None
+)
+
+_GEOCODE_CACHE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS geocode_cache (
+        addr_norm TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        inserted_at INTEGER NOT NULL
+    )
+'''
+
+_geocode_cache_local = threading.local()
+
+
+class CacheInfo(NamedTuple):
+    """Cache statistics, with the same fields as functools.lru_cache's cache_info()"""
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class _TTLCache:
+    """Small in-process cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        # Sync Maps calls can run on several request threads at once
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any, ttl: float) -> None:
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                # Evict the oldest entry; dicts preserve insertion order
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+def _get_geocode_cache_connection() -> Optional[sqlite3.Connection]:
+    """Return this thread's connection to the on-disk geocode cache, or None if it is unavailable"""
+    conn = getattr(_geocode_cache_local, 'conn', None)
+    if conn is None and _GEOCODE_CACHE_PATH:
+        try:
+            conn = sqlite3.connect(_GEOCODE_CACHE_PATH)
+            conn.execute(_GEOCODE_CACHE_SCHEMA)
+        except sqlite3.Error as e:
+            logger.warning("Geocode disk cache disabled: %s", e)
+            if conn is not None:
+                conn.close()
+            conn = False
+        _geocode_cache_local.conn = conn
+    return conn or None
+
+
+def _load_persisted_geocode(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Look up a geocode result stored by an earlier process"""
+    conn = _get_geocode_cache_connection()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            'SELECT payload FROM geocode_cache WHERE addr_norm = ? AND inserted_at > ?',
+            (cache_key, int(time.time()) - _GEOCODE_DISK_CACHE_TTL)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    try:
+        return json.loads(row[0])
+    except ValueError:
+        # A corrupt row counts as a miss; the next successful lookup overwrites it
+        return None
+
+
+def _persist_geocode(cache_key: str, result: Dict[str, Any]) -> None:
+    """Store a successful geocode result for later processes"""
+    conn = _get_geocode_cache_connection()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO geocode_cache (addr_norm, payload, inserted_at) VALUES (?, ?, ?)',
+                (cache_key, json.dumps(result), int(time.time()))
+            )
+    except sqlite3.Error as e:
+        logger.debug("Could not persist geocode for %r: %s", cache_key, e)
+
+
+# Upper bound on concurrent Maps lookups issued by verify_addresses_bulk
+_BULK_VERIFICATION_CONCURRENCY = 20
+
+# Outbound Maps requests: per-event-loop concurrency cap, and retries with backoff when
+# Google throttles or fails transiently. Quota throttling usually arrives as HTTP 200 with
+# an OVER_QUERY_LIMIT status in the body, so both the HTTP and the API status are checked
+_MAPS_MAX_CONCURRENCY = int(os.getenv('GOOGLE_MAPS_MAX_CONCURRENCY', '50'))
+_MAPS_MAX_ATTEMPTS = 3
+_MAPS_RETRY_BACKOFF = 0.5  # seconds; doubles after each failed attempt
+_MAPS_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAPS_THROTTLED_STATUS = 'OVER_QUERY_LIMIT'
+# Status reported by every lookup when no Maps key is configured
+_MAPS_NO_KEY_STATUS = 'NO_API_KEY'
+
+
+def _maps_retry_delay(attempt: int) -> float:
+    """Jittered exponential backoff to wait after the given (zero-based) failed attempt"""
+    return _MAPS_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+@lru_cache(maxsize=2)
+def _format_utc_second(seconds: int) -> str:
+    """Format a whole epoch second; cached so the strftime runs once per second"""
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+
+
+def _iso_now() -> str:
+    """Current UTC time in ISO 8601 format with microseconds"""
+    seconds, nanoseconds = divmod(time.time_ns(), 1_000_000_000)
+    return f"{_format_utc_second(seconds)}.{nanoseconds // 1000:06d}+00:00"
+
 
-class NavigationIssueType(Enum):
-    INCORRECT_ADDRESS = "incorrect_customer_address"
-    GPS_APP_CRASH = "gps_app_technical_failure"
-    LOCATION_DIFFICULTY = "customer_location_finding_difficulty"
+def _normalize_address(address: str) -> str:
+    """Normalize an address for use as a cache key"""
+    return " ".join(address.lower().split())
 
 
-class AddressIssueType(Enum):
-    WRONG_PIN_CODE = "incorrect_pin_code"
-    MISSING_DETAILS = "insufficient_address_details"
-    INVALID_LOCATION = "non_existent_address"
-    OUTDATED_INFO = "address_changed_recently"
+@lru_cache(maxsize=512)
+def _google_maps_navigation_link(origin: str, destination: str) -> str:
+    """Build the Google Maps navigation link; cached since the default locations repeat"""
+    maps_url = f"https://www.google.com/maps/dir/{urllib.parse.quote(origin)}/{urllib.parse.quote(destination)}/"
+    return f"[🗺️ Open Google Maps Navigation]({maps_url})"
 
 
-class GPSIssueType(Enum):
-    GPS_MALFUNCTION = "gps_hardware_failure"
-    APP_CRASH = "delivery_app_crash"
-    NETWORK_CONNECTIVITY = "poor_internet_connection"
-    MAP_DATA_CORRUPT = "corrupted_map_data"
+@lru_cache(maxsize=512)
+def _waze_navigation_link(destination: str) -> str:
+    """Build the Waze navigation link for a destination"""
+    query = urllib.parse.urlencode({'q': destination, 'navigate': 'yes'}, quote_via=urllib.parse.quote)
+    waze_url = f"https://waze.com/ul?{query}"
+    return f"[🚗 Open Waze Navigation]({waze_url})"
 
 
-class LocationDifficultyType(Enum):
-    GATED_SOCIETY = "restricted_access_community"
-    MISSING_LANDMARKS = "inadequate_navigation_markers"
-    COMPLEX_BUILDING = "multi_tower_confusion"
-    RURAL_AREA = "remote_location_challenges"
+def _coordinates_in_range(coordinates: Any) -> bool:
+    """True for a (lat, lon) pair inside the valid ranges; anything malformed is just invalid"""
+    try:
+        return len(coordinates) == 2 and -90 <= coordinates[0] <= 90 and -180 <= coordinates[1] <= 180
+    except TypeError:
+        return False
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NavigationContext:
     order_id: str
     customer_id: str
@@ -65,6 +310,29 @@ class NavigationContext:
     weather_conditions: Optional[str] = None
     evidence_image: Optional[bytes] = None
     additional_context: Optional[Dict[str, Any]] = None
+    gps_valid: bool = field(init=False)
+
+    def __post_init__(self):
+        # Range-check the coordinates once; the context is frozen so the flag stays valid
+        object.__setattr__(self, 'gps_valid', _coordinates_in_range(self.gps_coordinates))
+
+
+@dataclass(slots=True)
+class AddressIssueResult:
+    address_verification: Dict[str, Any]
+    address_analysis: Dict[str, Any]
+    verification_result: Dict[str, Any]
+    customer_communication: Dict[str, Any]
+    alternative_solutions: List[str]
+    performance_protection: Dict[str, Any]
+    timestamp: str
+    issue_type: str = "incorrect_address"
+    status: str = "handled"
+    maps_api_used: bool = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow dict view for JSON serialization"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
 
 class GoogleMapsAPI:
@@ -73,10 +341,99 @@ class GoogleMapsAPI:
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_MAPS_API_KEY')
         if not self.api_key:
-            raise ValueError("GOOGLE_MAPS_API_KEY not found in environment variables")
+            # Run offline: lookups report NO_API_KEY instead of failing handler construction
+            logger.warning("GOOGLE_MAPS_API_KEY not found in environment variables")
+            self.api_key = None
         self.base_url = "https://maps.googleapis.com/maps/api"
+        # Keep-alive pool shared by the sync geocode/directions calls
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+        # Recent lookups, shared by the sync and async variants
+        self._geocode_cache = _TTLCache(maxsize=4096)
+        self._directions_cache = _TTLCache(maxsize=1024)
+        # One pooled async client and request cap per event loop, created on that loop's first
+        # async call; connections and asyncio primitives cannot be shared between loops
+        self._async_clients: Dict[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]] = {}
+        self._async_clients_lock = threading.Lock()
 
     def geocode_address(self, address: str) -> Dict[str, Any]:
+        """Geocode an address, reusing recent results for the same normalized address"""
+        if not self.api_key:
+            return {'success': False, 'error': 'API key not available', 'status': _MAPS_NO_KEY_STATUS}
+
+        cache_key = _normalize_address(address)
+        result = self._geocode_cache.get(cache_key)
+        if result is None:
+            result = _load_persisted_geocode(cache_key)
+            if result is None:
+                result = self._request_geocode(address)
+                if result['success']:
+                    _persist_geocode(cache_key, result)
+            self._cache_geocode(cache_key, result)
+        return result
+
+    async def geocode_address_async(self, address: str) -> Dict[str, Any]:
+        """Non-blocking geocode_address for use inside the async handlers"""
+        if not self.api_key:
+            return {'success': False, 'error': 'API key not available', 'status': _MAPS_NO_KEY_STATUS}
+
+        cache_key = _normalize_address(address)
+        result = self._geocode_cache.get(cache_key)
+        if result is None:
+            # The on-disk cache is blocking sqlite, so it is read and written off the event loop
+            result = await asyncio.to_thread(_load_persisted_geocode, cache_key)
+            if result is None:
+                result = await self._request_geocode_async(address)
+                if result['success']:
+                    await asyncio.to_thread(_persist_geocode, cache_key, result)
+            self._cache_geocode(cache_key, result)
+        return result
+
+    def get_directions(self, origin: str, destination: str, mode: str = 'driving') -> Dict[str, Any]:
+        """Get directions between two points, reusing recent routes for the same endpoints"""
+        if not self.api_key:
+            return {'success': False, 'error': 'API key not available', 'status': _MAPS_NO_KEY_STATUS}
+
+        cache_key = (_normalize_address(origin), _normalize_address(destination), mode)
+        result = self._directions_cache.get(cache_key)
+        if result is None:
+            result = self._request_directions(origin, destination, mode)
+            self._cache_directions(cache_key, result)
+        return result
+
+    async def get_directions_async(self, origin: str, destination: str, mode: str = 'driving') -> Dict[str, Any]:
+        """Non-blocking get_directions for use inside the async handlers"""
+        if not self.api_key:
+            return {'success': False, 'error': 'API key not available', 'status': _MAPS_NO_KEY_STATUS}
+
+        cache_key = (_normalize_address(origin), _normalize_address(destination), mode)
+        result = self._directions_cache.get(cache_key)
+        if result is None:
+            result = await self._request_directions_async(origin, destination, mode)
+            self._cache_directions(cache_key, result)
+        return result
+
+    def cache_info(self) -> Dict[str, CacheInfo]:
+        """In-memory cache statistics for monitoring, keyed by 'geocode' and 'directions'"""
+        return {
+            'geocode': self._geocode_cache.info(),
+            'directions': self._directions_cache.info()
+        }
+
+    def cache_clear(self) -> None:
+        """Drop in-memory geocode and directions results; the on-disk geocode cache is kept"""
+        self._geocode_cache.clear()
+        self._directions_cache.clear()
+
+    def _cache_geocode(self, cache_key: str, result: Dict[str, Any]) -> None:
+        ttl = _ADDRESS_CACHE_TTL if result['success'] else _ADDRESS_NEGATIVE_CACHE_TTL
+        self._geocode_cache.set(cache_key, result, ttl)
+
+    def _cache_directions(self, cache_key: Tuple[str, str, str], result: Dict[str, Any]) -> None:
+        ttl = _DIRECTIONS_CACHE_TTL if result['success'] else _ADDRESS_NEGATIVE_CACHE_TTL
+        self._directions_cache.set(cache_key, result, ttl)
+
+    def _request_geocode(self, address: str) -> Dict[str, Any]:
         """Geocode an address to get coordinates and formatted address"""
         try:
             url = f"{self.base_url}/geocode/json"
@@ -85,25 +442,24 @@ class GoogleMapsAPI:
                 'key': self.api_key
             }
 
-            response = requests.get(url, params=params)
-            data = response.json()
+            return self._parse_geocode_response(self._get_json(url, params))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'status': 'API_ERROR'
+            }
 
-            if data['status'] == 'OK' and data['results']:
-                result = data['results'][0]
-                return {
-                    'success': True,
-                    'formatted_address': result['formatted_address'],
-                    'latitude': result['geometry']['location']['lat'],
-                    'longitude': result['geometry']['location']['lng'],
-                    'place_id': result['place_id'],
-                    'types': result.get('types', [])
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': data.get('error_message', 'Address not found'),
-                    'status': data['status']
-                }
+    async def _request_geocode_async(self, address: str) -> Dict[str, Any]:
+        """Geocode an address over the pooled async client"""
+        try:
+            url = f"{self.base_url}/geocode/json"
+            params = {
+                'address': address,
+                'key': self.api_key
+            }
+
+            return self._parse_geocode_response(await self._get_json_async(url, params))
         except Exception as e:
             return {
                 'success': False,
@@ -111,7 +467,7 @@ class GoogleMapsAPI:
                 'status': 'API_ERROR'
             }
 
-    def get_directions(self, origin: str, destination: str, mode: str = 'driving') -> Dict[str, Any]:
+    def _request_directions(self, origin: str, destination: str, mode: str) -> Dict[str, Any]:
         """Get directions between two points"""
         try:
             url = f"{self.base_url}/directions/json"
@@ -122,27 +478,7 @@ class GoogleMapsAPI:
                 'key': self.api_key
             }
 
-            response = requests.get(url, params=params)
-            data = response.json()
-
-            if data['status'] == 'OK' and data['routes']:
-                route = data['routes'][0]
-                leg = route['legs'][0]
-                return {
-                    'success': True,
-                    'distance': leg['distance']['text'],
-                    'duration': leg['duration']['text'],
-                    'start_address': leg['start_address'],
-                    'end_address': leg['end_address'],
-                    'steps': len(leg['steps']),
-                    'overview_polyline': route['overview_polyline']['points']
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': data.get('error_message', 'Route not found'),
-                    'status': data['status']
-                }
+            return self._parse_directions_response(self._get_json(url, params))
         except Exception as e:
             return {
                 'success': False,
@@ -150,90 +486,281 @@ class GoogleMapsAPI:
                 'status': 'API_ERROR'
             }
 
-    def generate_static_map_url(self, center: str, markers: List[str] = None, zoom: int = 15, size: str = "600x400") -> str:
-        """Generate static map URL with markers"""
+    async def _request_directions_async(self, origin: str, destination: str, mode: str) -> Dict[str, Any]:
+        """Get directions between two points over the pooled async client"""
         try:
-            url = f"{self.base_url}/staticmap"
+            url = f"{self.base_url}/directions/json"
             params = {
-                'center': center,
-                'zoom': zoom,
-                'size': size,
+                'origin': origin,
+                'destination': destination,
+                'mode': mode,
                 'key': self.api_key
             }
 
-            if markers:
-                for i, marker in enumerate(markers):
-                    params[f'markers'] = f"color:red|label:{i+1}|{marker}"
-
-            return f"{url}?" + "&".join([f"{k}={urllib.parse.quote(str(v))}" for k, v in params.items()])
+            return self._parse_directions_response(await self._get_json_async(url, params))
         except Exception as e:
-            return f"Error generating map: {str(e)}"
-
-
-class NavigationLocationHandler:
-    def __init__(self, groq_api_key: str = None):
-        self.service = "grab_food"
-        self.actor = "delivery_agent"
-        self.max_search_time = 20  # minutes
-        self.escalation_threshold = 15  # minutes
-        # Default testing locations
-        self.default_current_location = "Sapna Book Stores, Jayanagar, Bangalore"
-        self.default_destination = "South End Circle Metro, Bangalore"
-        self.maps_api = GoogleMapsAPI()
-
-    def handle_navigation_issues(self, query: str, image_data: Optional[str] = None) -> str:
-        """Main handler for navigation issues - simple interface for AI engine"""
-
-        query_lower = query.lower()
-
-        # Try to extract order details for better navigation assistance
-        order_details = self._get_order_details_from_query(query)
+            return {
+                'success': False,
+                'error': str(e),
+                'status': 'API_ERROR'
+            }
 
-        if any(word in query_lower for word in ['stuck', 'traffic', 'reroute', 'alternative route']):
-            return self.handle_traffic_rerouting(query, image_data, order_details)
-        elif any(word in query_lower for word in ['address', 'wrong address', 'find location']):
-            return self.handle_address_issues(query, image_data, order_details)
-        elif any(word in query_lower for word in ['gps', 'maps', 'navigation not working']):
-            return self.handle_gps_issues(query, image_data, order_details)
+    def _get_async_client(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """Pooled async client and request cap for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                # Release clients of loops that have finished, e.g. an earlier asyncio.run();
+                # their connections belong to that loop and cannot be reused from this one
+                for finished_loop in [known for known in self._async_clients if known.is_closed()]:
+                    del self._async_clients[finished_loop]
+                entry = (
+                    httpx.AsyncClient(
+                        timeout=5.0,
+                        limits=httpx.Limits(max_keepalive_connections=32)
+                    ),
+                    asyncio.Semaphore(_MAPS_MAX_CONCURRENCY)
+                )
+                self._async_clients[loop] = entry
+        return entry
+
+    def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET a Maps endpoint over the keep-alive session, retrying throttled and 5xx responses"""
+        for attempt in range(_MAPS_MAX_ATTEMPTS):
+            last_attempt = attempt == _MAPS_MAX_ATTEMPTS - 1
+            response = self.session.get(url, params=params, timeout=(2, 5))
+            if response.status_code not in _MAPS_RETRY_STATUSES or last_attempt:
+                data = response.json()
+                if data.get('status') != _MAPS_THROTTLED_STATUS or last_attempt:
+                    return data
+            time.sleep(_maps_retry_delay(attempt))
+
+    async def _get_json_async(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET a Maps endpoint through the async client under the concurrency cap, with the same retries"""
+        client, semaphore = self._get_async_client()
+        for attempt in range(_MAPS_MAX_ATTEMPTS):
+            last_attempt = attempt == _MAPS_MAX_ATTEMPTS - 1
+            async with semaphore:
+                response = await client.get(url, params=params)
+            if response.status_code not in _MAPS_RETRY_STATUSES or last_attempt:
+                data = response.json()
+                if data.get('status') != _MAPS_THROTTLED_STATUS or last_attempt:
+                    return data
+            # Back off outside the semaphore so waiting retries do not hold a slot
+            await asyncio.sleep(_maps_retry_delay(attempt))
+
+    async def aclose(self) -> None:
+        """Close the running event loop's async client and the sync session"""
+        with self._async_clients_lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].aclose()
+        self.session.close()
+
+    @staticmethod
+    def _parse_geocode_response(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a geocode API response into the result dict used by the handlers"""
+        if data['status'] == 'OK' and data['results']:
+            result = data['results'][0]
+            return {
+                'success': True,
+                'formatted_address': result['formatted_address'],
+                'latitude': result['geometry']['location']['lat'],
+                'longitude': result['geometry']['location']['lng'],
+                'place_id': result['place_id'],
+                'types': result.get('types', [])
+            }
         else:
-            return self.handle_general_navigation(query, image_data, order_details)
-
-    def handle_traffic_rerouting(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
-        """Handle traffic issues and provide rerouting with Google Maps API"""
-
-        # Extract locations from query, order details, or use defaults
-        current_location = self._extract_current_location(query)
-        destination = self._extract_destination(query)
-
-        # Use order details if available and locations not found in query
-        if order_details:
-            if not current_location:
-                current_location = order_details.get('start_location') or order_details.get('restaurant_name')
-            if not destination:
-                destination = order_details.get('end_location')
-
-        # Fall back to defaults if still not found
-        current_location = current_location or self.default_current_location
-        destination = destination or self.default_destination
-
-        # Get real-time directions using Google Maps API
-        directions_result = self.maps_api.get_directions(current_location, destination)
+            return {
+                'success': False,
+                'error': data.get('error_message', 'Address not found'),
+                'status': data['status']
+            }
 
-        # Generate navigation links
-        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
-        waze_link = self._generate_waze_navigation_link(current_location, destination)
+    @staticmethod
+    def _parse_directions_response(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a directions API response into the result dict used by the handlers"""
+        if data['status'] == 'OK' and data['routes']:
+            route = data['routes'][0]
+            leg = route['legs'][0]
+            return {
+                'success': True,
+                'distance': leg['distance']['text'],
+                'duration': leg['duration']['text'],
+                'start_address': leg['start_address'],
+                'end_address': leg['end_address'],
+                'steps': len(leg['steps']),
+                'overview_polyline': route['overview_polyline']['points']
+            }
+        else:
+            return {
+                'success': False,
+                'error': data.get('error_message', 'Route not found'),
+                'status': data['status']
+            }
 
-        # Include real-time route information if available
-        route_info = ""
-        if directions_result['success']:
-            route_info = f"""
-**📊 Real-time Route Information:**
-- **Distance:** {directions_result['distance']}
-- **Estimated Time:** {directions_result['duration']}
-- **Route Steps:** {directions_result['steps']} navigation points
-"""
+    def generate_static_map_url(self, center: str, markers: List[str] = None, zoom: int = 15, size: str = "600x400") -> str:
+        """Generate static map URL with markers"""
+        url = f"{self.base_url}/staticmap"
+        params = [
+            ('center', center),
+            ('zoom', zoom),
+            ('size', size)
+        ]
+        # Offline (no API key): leave the key out rather than sending key=None
+        if self.api_key:
+            params.append(('key', self.api_key))
+        # The Static Maps API takes one markers parameter per marker
+        params.extend(
+            ('markers', f"color:red|label:{i + 1}|{marker}") for i, marker in enumerate(markers or ())
+        )
 
-        return f"""🚦 **Traffic Rerouting Solution**
+        return f"{url}?{urllib.parse.urlencode(params, quote_via=urllib.parse.quote)}"
+
+
+_shared_maps_api: Optional[GoogleMapsAPI] = None
+
+
+def _get_maps_api() -> GoogleMapsAPI:
+    """Process-wide Maps client so every handler instance reuses one connection pool"""
+    global _shared_maps_api
+    if _shared_maps_api is None:
+        _shared_maps_api = GoogleMapsAPI()
+    return _shared_maps_api
+
+
+# Baseline minutes to resolve each address issue type, before responsiveness and confidence penalties
+_BASE_RESOLUTION_TIME = MappingProxyType({
+    AddressIssueType.WRONG_PIN_CODE: 5,
+    AddressIssueType.MISSING_DETAILS: 8,
+    AddressIssueType.INVALID_LOCATION: 15,
+    AddressIssueType.OUTDATED_INFO: 10
+})
+
+# Recommendation and alternative lists per (issue type, maps verified) outcome, built once
+_VERIFIED_ADDRESS_RECOMMENDATIONS = (
+    "use_verified_coordinates_for_navigation",
+    "share_precise_location_with_customer",
+    "enable_gps_guided_navigation"
+)
+
+_UNVERIFIED_ADDRESS_RECOMMENDATIONS = (
+    "contact_customer_for_address_clarification",
+    "request_nearby_landmarks_or_reference_points",
+    "suggest_alternative_pickup_location"
+)
+
+_ISSUE_SPECIFIC_RECOMMENDATIONS = MappingProxyType({
+    AddressIssueType.MISSING_DETAILS: (
+        "request_complete_address_with_building_details",
+        "ask_for_floor_number_and_apartment_details",
+        "get_contact_person_information"
+    ),
+    AddressIssueType.INVALID_LOCATION: (
+        "verify_address_exists_in_maps",
+        "suggest_nearest_valid_address",
+        "coordinate_with_customer_service"
+    )
+})
+
+_ADDRESS_RECOMMENDATIONS = MappingProxyType({
+    (issue_type, verified): (
+        (_VERIFIED_ADDRESS_RECOMMENDATIONS if verified else _UNVERIFIED_ADDRESS_RECOMMENDATIONS)
+        + _ISSUE_SPECIFIC_RECOMMENDATIONS.get(issue_type, ())
+    )
+    for issue_type in AddressIssueType
+    for verified in (True, False)
+})
+
+_VERIFIED_ADDRESS_ALTERNATIVES = (
+    "navigate_to_verified_coordinates",
+    "enable_turn_by_turn_navigation",
+    "share_live_location_with_customer"
+)
+
+_UNVERIFIED_ADDRESS_ALTERNATIVES = (
+    "suggest_nearest_landmark_pickup",
+    "coordinate_alternative_meeting_point",
+    "escalate_to_customer_service_support"
+)
+
+_SLOW_RESOLUTION_ALTERNATIVES = (
+    "consider_order_reassignment_to_nearby_agent",
+    "offer_customer_pickup_from_restaurant",
+    "implement_partial_refund_with_future_credit"
+)
+
+_ADDRESS_ALTERNATIVES = MappingProxyType({
+    (verified, slow_resolution): (
+        (_VERIFIED_ADDRESS_ALTERNATIVES if verified else _UNVERIFIED_ADDRESS_ALTERNATIVES)
+        + (_SLOW_RESOLUTION_ALTERNATIVES if slow_resolution else ())
+    )
+    for verified in (True, False)
+    for slow_resolution in (True, False)
+})
+
+
+# Keys shared by every address performance protection result
+_PERF_PROTECTION_BASE = (
+    ("delivery_time_adjustment", True),
+    ("performance_score_protection", True),
+    ("incident_classification", "customer_provided_incorrect_address")
+)
+
+# An address Maps never checked is not credited to the customer; the incident goes to manual review
+_PERF_PROTECTION_UNVERIFIED = MappingProxyType({
+    "delivery_time_adjustment": False,
+    "performance_score_protection": False,
+    "incident_classification": "address_unverified_maps_unavailable",
+    "compensation_eligible": False,
+    "time_spent_excluded_from_metrics": 0,
+    "manual_review_required": True
+})
+
+# Customer outreach for address corrections, specialized on whether the customer is responsive
+_ADDRESS_CONTACT_NOT_REQUIRED = MappingProxyType({
+    "communication_initiated": False,
+    "reason": "address_verified_by_maps"
+})
+
+_ADDRESS_CONTACT_RESPONSIVE = MappingProxyType({
+    "communication_initiated": True,
+    "channels": ("call", "sms"),
+    "message_type": "address_clarification_request",
+    "escalation_required": False
+})
+
+# Unresponsive customers get asynchronous channels and a support escalation
+_ADDRESS_CONTACT_UNRESPONSIVE = MappingProxyType({
+    "communication_initiated": True,
+    "channels": ("sms", "app_message"),
+    "message_type": "address_clarification_request",
+    "escalation_required": True,
+    "follow_up_in_minutes": 5
+})
+
+# Fixed step labels reported by _execute_address_verification
+_ADDRESS_VERIFIED_STEPS = (
+    "google_maps_address_verified",
+    "coordinates_extracted_successfully",
+    "navigation_route_calculated"
+)
+
+_ADDRESS_VERIFICATION_FAILED_STEPS = (
+    "google_maps_verification_failed",
+    "address_not_found_in_maps_database",
+    "customer_contact_required_for_clarification"
+)
+
+# Without a Maps key nothing was checked, so the address is neither verified nor rejected
+_ADDRESS_VERIFICATION_SKIPPED_STEPS = (
+    "google_maps_verification_skipped_no_api_key",
+    "customer_contact_required_for_clarification"
+)
+
+# Response templates for the text handlers; filled in with str.format per request
+_TRAFFIC_REROUTING_TEMPLATE = """🚦 **Traffic Rerouting Solution**
 
 **Current Route Issue:** Traffic detected on your current path
 
@@ -265,49 +792,7 @@ class NavigationLocationHandler:
 
 **💡 Pro Tip:** Save both links for easy access during delivery!"""
 
-    def handle_address_issues(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
-        """Handle incorrect or unclear addresses with Google Maps API verification"""
-
-        # Extract locations from query, order details, or use defaults
-        current_location = self._extract_current_location(query)
-        destination = self._extract_destination(query)
-
-        # Use order details if available
-        order_info = ""
-        if order_details:
-            if not current_location:
-                current_location = order_details.get('start_location') or order_details.get('restaurant_name')
-            if not destination:
-                destination = order_details.get('end_location')
-            order_info = f"\n**📋 Order Info:**\n- Order ID: {order_details.get('order_id', 'N/A')}\n- Restaurant: {order_details.get('restaurant_name', 'N/A')}\n- Payment: {order_details.get('payment_method', 'N/A')}\n"
-
-        # Fall back to defaults if still not found
-        current_location = current_location or self.default_current_location
-        destination = destination or self.default_destination
-
-        # Verify address using Google Maps API
-        address_verification = self.maps_api.geocode_address(destination)
-
-        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
-
-        # Address verification information
-        verification_info = ""
-        if address_verification['success']:
-            verification_info = f"""
-**✅ Address Verification:**
-- **Verified Address:** {address_verification['formatted_address']}
-- **Coordinates:** {address_verification['latitude']:.4f}, {address_verification['longitude']:.4f}
-- **Status:** Address found in Google Maps database
-"""
-        else:
-            verification_info = f"""
-**⚠️ Address Verification:**
-- **Status:** Address not found in Google Maps
-- **Issue:** {address_verification.get('error', 'Unknown error')}
-- **Action Required:** Customer verification needed
-"""
-
-        return f"""🏠 **Address Resolution Assistant**
+_ADDRESS_ISSUES_TEMPLATE = """🏠 **Address Resolution Assistant**
 
 {verification_info}
 
@@ -338,23 +823,7 @@ class NavigationLocationHandler:
 
 **🆘 Escalation:** If address cannot be resolved in 15 minutes, contact customer support for assistance."""
 
-    def handle_gps_issues(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
-        """Handle GPS and navigation app technical problems"""
-
-        current_location = self._extract_current_location(query) or self.default_current_location
-        destination = self._extract_destination(query) or self.default_destination
-
-        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
-        waze_link = self._generate_waze_navigation_link(current_location, destination)
-
-        # Generate static map for offline reference
-        static_map_url = self.maps_api.generate_static_map_url(
-            center=destination,
-            markers=[current_location, destination],
-            zoom=14
-        )
-
-        return f"""📱 **GPS & Navigation Fix**
+_GPS_ISSUES_TEMPLATE = """📱 **GPS & Navigation Fix**
 
 **🔧 Immediate Solutions:**
 
@@ -390,26 +859,7 @@ class NavigationLocationHandler:
 - Time spent troubleshooting is protected
 - Device replacement available for persistent problems"""
 
-    def handle_general_navigation(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
-        """General navigation assistance"""
-
-        current_location = self._extract_current_location(query) or self.default_current_location
-        destination = self._extract_destination(query) or self.default_destination
-
-        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
-
-        # Get route information if possible
-        directions_result = self.maps_api.get_directions(current_location, destination)
-        route_summary = ""
-        if directions_result['success']:
-            route_summary = f"""
-**📊 Route Summary:**
-- **Distance:** {directions_result['distance']}
-- **Estimated Time:** {directions_result['duration']}
-- **Navigation Steps:** {directions_result['steps']} turns/instructions
-"""
-
-        return f"""🧭 **Navigation Assistant**
+_GENERAL_NAVIGATION_TEMPLATE = """🧭 **Navigation Assistant**
 
 **📍 Your Navigation Link:**
 {maps_link}
@@ -442,18 +892,184 @@ class NavigationLocationHandler:
 - Keep multiple navigation apps installed
 - Always inform customer about any delays immediately"""
 
+
+class NavigationLocationHandler:
+    # Sub-handler method per issue type; GPS crash and location difficulty flows are not implemented
+    _DISPATCH = {
+        NavigationIssueType.INCORRECT_ADDRESS: "_handle_incorrect_address"
+    }
+
+    def __init__(self, groq_api_key: str = None):
+        self.service = "grab_food"
+        self.actor = "delivery_agent"
+        self.max_search_time = 20  # minutes
+        self.escalation_threshold = 15  # minutes
+        # Default testing locations
+        self.default_current_location = "Sapna Book Stores, Jayanagar, Bangalore"
+        self.default_destination = "South End Circle Metro, Bangalore"
+        # Created on first Maps lookup; queries that never reach Maps do not need it
+        self._maps_api = None
+
+    @property
+    def maps_api(self) -> GoogleMapsAPI:
+        """Shared Google Maps client for this process"""
+        if self._maps_api is None:
+            self._maps_api = _get_maps_api()
+        return self._maps_api
+
+    def handle_navigation_issues(self, query: str, image_data: Optional[str] = None) -> str:
+        """Main handler for navigation issues - simple interface for AI engine"""
+
+        query_lower = query.lower()
+
+        # Try to extract order details for better navigation assistance
+        order_details = self._get_order_details_from_query(query, query_lower)
+
+        words = set(_QUERY_WORD_RE.findall(query_lower))
+
+        if not _TRAFFIC_KEYWORDS.isdisjoint(words) or any(p in query_lower for p in _TRAFFIC_PHRASES):
+            return self.handle_traffic_rerouting(query, image_data, order_details)
+        elif not _ADDRESS_KEYWORDS.isdisjoint(words) or any(p in query_lower for p in _ADDRESS_PHRASES):
+            return self.handle_address_issues(query, image_data, order_details)
+        elif not _GPS_KEYWORDS.isdisjoint(words) or any(p in query_lower for p in _GPS_PHRASES):
+            return self.handle_gps_issues(query, image_data, order_details)
+        else:
+            return self.handle_general_navigation(query, image_data, order_details)
+
+    def handle_traffic_rerouting(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
+        """Handle traffic issues and provide rerouting with Google Maps API"""
+
+        current_location, destination = self._resolve_locations(query, order_details)
+
+        # Get real-time directions using Google Maps API
+        directions_result = self.maps_api.get_directions(current_location, destination)
+
+        # Generate navigation links
+        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
+        waze_link = self._generate_waze_navigation_link(current_location, destination)
+
+        # Include real-time route information if available
+        route_info = ""
+        if directions_result['success']:
+            route_info = f"""
+**📊 Real-time Route Information:**
+- **Distance:** {directions_result['distance']}
+- **Estimated Time:** {directions_result['duration']}
+- **Route Steps:** {directions_result['steps']} navigation points
+"""
+
+        return _TRAFFIC_REROUTING_TEMPLATE.format(
+            maps_link=maps_link,
+            waze_link=waze_link,
+            current_location=current_location,
+            destination=destination,
+            route_info=route_info
+        )
+
+    def handle_address_issues(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
+        """Handle incorrect or unclear addresses with Google Maps API verification"""
+
+        current_location, destination = self._resolve_locations(query, order_details)
+
+        # Verify address using Google Maps API
+        address_verification = self.maps_api.geocode_address(destination)
+
+        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
+
+        # Address verification information
+        verification_info = ""
+        if address_verification['success']:
+            verification_info = f"""
+**✅ Address Verification:**
+- **Verified Address:** {address_verification['formatted_address']}
+- **Coordinates:** {address_verification['latitude']:.4f}, {address_verification['longitude']:.4f}
+- **Status:** Address found in Google Maps database
+"""
+        else:
+            verification_info = f"""
+**⚠️ Address Verification:**
+- **Status:** Address not found in Google Maps
+- **Issue:** {address_verification.get('error', 'Unknown error')}
+- **Action Required:** Customer verification needed
+"""
+
+        return _ADDRESS_ISSUES_TEMPLATE.format(
+            verification_info=verification_info,
+            maps_link=maps_link,
+            current_location=current_location,
+            destination=destination
+        )
+
+    def handle_gps_issues(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
+        """Handle GPS and navigation app technical problems"""
+
+        current_location, destination = self._resolve_locations(query, order_details)
+
+        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
+        waze_link = self._generate_waze_navigation_link(current_location, destination)
+
+        # Generate static map for offline reference
+        static_map_url = self.maps_api.generate_static_map_url(
+            center=destination,
+            markers=[current_location, destination],
+            zoom=14
+        )
+
+        return _GPS_ISSUES_TEMPLATE.format(
+            maps_link=maps_link,
+            waze_link=waze_link,
+            static_map_url=static_map_url,
+            current_location=current_location,
+            destination=destination
+        )
+
+    def handle_general_navigation(self, query: str, image_data: Optional[str] = None, order_details: Optional[Dict] = None) -> str:
+        """General navigation assistance"""
+
+        current_location, destination = self._resolve_locations(query, order_details)
+
+        maps_link = self._generate_google_maps_navigation_link(current_location, destination)
+
+        # Get route information if possible
+        directions_result = self.maps_api.get_directions(current_location, destination)
+        route_summary = ""
+        if directions_result['success']:
+            route_summary = f"""
+**📊 Route Summary:**
+- **Distance:** {directions_result['distance']}
+- **Estimated Time:** {directions_result['duration']}
+- **Navigation Steps:** {directions_result['steps']} turns/instructions
+"""
+
+        return _GENERAL_NAVIGATION_TEMPLATE.format(
+            maps_link=maps_link,
+            current_location=current_location,
+            destination=destination,
+            route_summary=route_summary
+        )
+
+    def _resolve_locations(self, query: str, order_details: Optional[Dict] = None) -> Tuple[str, str]:
+        """Resolve (current_location, destination) from the query, then the order, then the testing defaults"""
+        current_location = self._extract_current_location(query)
+        destination = self._extract_destination(query)
+
+        # Use order details if available and locations not found in query
+        if order_details:
+            if not current_location:
+                current_location = order_details.get('start_location') or order_details.get('restaurant_name')
+            if not destination:
+                destination = order_details.get('end_location')
+
+        return (
+            current_location or self.default_current_location,
+            destination or self.default_destination
+        )
+
     def _extract_current_location(self, query: str) -> Optional[str]:
         """Extract current location from query if mentioned"""
         # Look for patterns like "from [location]" or "currently at [location]"
-        import re
-
-        patterns = [
-            r'(?:from|currently at|at|starting from)\s+([^,]+(?:,\s*[^,]+)*)',
-            r'(?:my location is|i am at|im at)\s+([^,]+(?:,\s*[^,]+)*)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query.lower())
+        for pattern in _CURRENT_LOC_RES:
+            match = pattern.search(query)
             if match:
                 return match.group(1).strip()
 
@@ -461,15 +1077,8 @@ class NavigationLocationHandler:
 
     def _extract_destination(self, query: str) -> Optional[str]:
         """Extract destination from query if mentioned"""
-        import re
-
-        patterns = [
-            r'(?:to|going to|destination|deliver to)\s+([^,]+(?:,\s*[^,]+)*)',
-            r'(?:customer at|address is|location is)\s+([^,]+(?:,\s*[^,]+)*)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query.lower())
+        for pattern in _DEST_RES:
+            match = pattern.search(query)
             if match:
                 return match.group(1).strip()
 
@@ -477,190 +1086,184 @@ class NavigationLocationHandler:
 
     def _generate_google_maps_navigation_link(self, origin: str, destination: str) -> str:
         """Generate Google Maps navigation link"""
-        # URL encode the locations
-        origin_encoded = urllib.parse.quote(origin)
-        destination_encoded = urllib.parse.quote(destination)
-
-        # Google Maps navigation URL format
-        maps_url = f"https://www.google.com/maps/dir/{origin_encoded}/{destination_encoded}/"
-
-        return f"[🗺️ Open Google Maps Navigation]({maps_url})"
+        return _google_maps_navigation_link(origin, destination)
 
     def _generate_waze_navigation_link(self, origin: str, destination: str) -> str:
         """Generate Waze navigation link"""
-        destination_encoded = urllib.parse.quote(destination)
-
-        # Waze navigation URL format
-        waze_url = f"https://waze.com/ul?q={destination_encoded}&navigate=yes"
-
-        return f"[🚗 Open Waze Navigation]({waze_url})"
-
-    def _get_order_details_from_query(self, query: str) -> Optional[Dict]:
+        return _waze_navigation_link(destination)
+
+    def _get_db_connection(self) -> Optional[sqlite3.Connection]:
+        """Return this thread's read-only connection to the orders database, opened on first use"""
+        conn = getattr(_db_local, 'conn', None)
+        if conn is None and _DB_PATH:
+            conn = sqlite3.connect(_DB_PATH)
+            conn.execute('PRAGMA query_only = ON')
+            _db_local.conn = conn
+        return conn
+
+    def _get_order_details_from_query(self, query: str, query_lower: Optional[str] = None) -> Optional[Dict]:
         """Extract order details from database for better navigation assistance"""
-        import sqlite3
-        import os
-        import json
-        import re
+        # Most queries never mention an order, so skip the regex engine entirely
+        if 'order' not in (query_lower or query.lower()):
+            return None
 
         try:
             # Try to extract order ID from query
-            order_id_match = re.search(r'order[\s#]*([A-Z]{1,2}\d{3,4})', query, re.IGNORECASE)
+            order_id_match = _ORDER_ID_RE.search(query)
             order_id = order_id_match.group(1) if order_id_match else None
 
             if not order_id:
                 return None
 
-            # Find database path
-            database_paths = [
-                'grabhack.db',
-                '../grabhack.db',
-                'GrabHack/grabhack.db',
-                os.path.join(os.path.dirname(__file__), '../../grabhack.db')
-            ]
-
-            db_path = None
-            for path in database_paths:
-                if os.path.exists(path):
-                    db_path = path
-                    break
-
-            if not db_path:
+            conn = self._get_db_connection()
+            if conn is None:
                 return None
 
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
             # Get order details
-            cursor.execute('''
-                SELECT
-                    id, start_location, end_location, restaurant_name,
-                    customer_id, status, payment_method, details
-                FROM orders
-                WHERE id = ? AND service = 'grab_food'
-            ''', (order_id,))
-
-            result = cursor.fetchone()
-            conn.close()
+            result = conn.execute(_ORDER_SQL, (order_id,)).fetchone()
 
             if result:
-                order_id, start_loc, end_loc, restaurant, customer_id, status, payment_method, details = result
+                order_id, start_loc, end_loc, restaurant = result
 
-                order_details = {
+                return {
                     'order_id': order_id,
                     'start_location': start_loc or 'Restaurant Area',
                     'end_location': end_loc or 'Customer Location',
-                    'restaurant_name': restaurant or 'Restaurant',
-                    'customer_id': customer_id,
-                    'status': status,
-                    'payment_method': payment_method
+                    'restaurant_name': restaurant or 'Restaurant'
                 }
 
-                # Add details from JSON if available
-                if details:
-                    try:
-                        details_json = json.loads(details)
-                        order_details.update(details_json)
-                    except:
-                        pass
-
-                return order_details
-
         except Exception as e:
             return None
 
         return None
 
     async def handle_navigation_issue(self, context: NavigationContext) -> Dict[str, Any]:
-        """Main handler for all navigation and location issues"""
-
-        if context.issue_type == NavigationIssueType.INCORRECT_ADDRESS:
-            return await self._handle_incorrect_address(context)
-        elif context.issue_type == NavigationIssueType.GPS_APP_CRASH:
-            return await self._handle_gps_app_crash(context)
-        elif context.issue_type == NavigationIssueType.LOCATION_DIFFICULTY:
-            return await self._handle_location_difficulty(context)
-        else:
+        """Main handler for all navigation and location issues; every outcome is a plain dict"""
+
+        # One timestamp per incident, shared by whichever sub-handler runs
+        timestamp = _iso_now()
+
+        label = NAVIGATION_ISSUE_LABELS.get(context.issue_type)
+        if label is None:
             return {"error": "Unknown navigation issue type"}
 
-    async def _handle_incorrect_address(self, context: NavigationContext) -> Dict[str, Any]:
+        method_name = self._DISPATCH.get(context.issue_type)
+        if method_name is None:
+            # A valid issue type this service has no handler for yet
+            return {"error": f"Unsupported navigation issue type: {label}"}
+        logger.debug("Handling %s for order %s", label, context.order_id)
+        result = await getattr(self, method_name)(context, timestamp)
+        return result.to_dict()
+
+    async def _handle_incorrect_address(self, context: NavigationContext, timestamp: str) -> AddressIssueResult:
         """Handle incorrect customer address issues with Google Maps verification"""
 
         # Verify address using Google Maps API
-        address_verification = self.maps_api.geocode_address(context.target_address)
+        address_verification = await self._verify_address_with_maps_api(context.target_address)
 
         # Analyze address issue using AI and API results
-        address_analysis = await self._analyze_address_issue_with_api(context, address_verification)
+        address_analysis = self._analyze_address_issue_with_api(context, address_verification)
 
-        # Execute enhanced address verification protocol
-        verification_result = await self._execute_address_verification(context, address_analysis, address_verification)
+        # Route verification is the only step left that waits on the network; a failure
+        # there should not discard the rest of the response
+        try:
+            verification_result = await self._execute_address_verification(context, address_analysis, address_verification)
+            failed = False
+        except Exception as e:
+            verification_result = {"error": str(e)}
+            failed = True
+
+        customer_communication = self._initiate_address_correction_communication(context, address_analysis)
+        alternative_solutions = self._explore_address_alternatives_with_maps(context, address_analysis, address_verification)
+        performance_protection = self._apply_address_performance_protection(context, address_analysis)
+
+        return AddressIssueResult(
+            address_verification=address_verification,
+            address_analysis=address_analysis,
+            verification_result=verification_result,
+            customer_communication=customer_communication,
+            alternative_solutions=alternative_solutions,
+            performance_protection=performance_protection,
+            timestamp=timestamp,
+            status="partially_handled" if failed else "handled",
+            maps_api_used=not address_analysis["MAPS_VERIFICATION_SKIPPED"]
+        )
 
-        # Customer communication for address correction
-        customer_communication = await self._initiate_address_correction_communication(context, address_analysis)
+    async def _verify_address_with_maps_api(self, address: str) -> Dict[str, Any]:
+        """Geocode an address; the Maps client caches recent results per normalized address"""
+        return await self.maps_api.geocode_address_async(address)
 
-        # Alternative location strategies using Maps API
-        alternative_solutions = await self._explore_address_alternatives_with_maps(context, address_analysis, address_verification)
+    async def verify_addresses_bulk(self, addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Verify many addresses concurrently, e.g. when several stuck orders are processed together"""
+        semaphore = asyncio.Semaphore(_BULK_VERIFICATION_CONCURRENCY)
 
-        # Performance protection
-        performance_protection = await self._apply_address_performance_protection(context, address_analysis)
+        async def verify_one(address: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._verify_address_with_maps_api(address)
 
-        return {
-            "issue_type": "incorrect_address",
-            "address_verification": address_verification,
-            "address_analysis": address_analysis,
-            "verification_result": verification_result,
-            "customer_communication": customer_communication,
-            "alternative_solutions": alternative_solutions,
-            "performance_protection": performance_protection,
-            "status": "handled",
-            "timestamp": datetime.now().isoformat(),
-            "maps_api_used": True
-        }
+        # Duplicate addresses share a single lookup
+        unique_addresses = list(dict.fromkeys(addresses))
+        results = await asyncio.gather(*(verify_one(address) for address in unique_addresses), return_exceptions=True)
+
+        verified = {}
+        for address, result in zip(unique_addresses, results):
+            if isinstance(result, Exception):
+                result = {
+                    'success': False,
+                    'error': str(result),
+                    'status': 'API_ERROR'
+                }
+            verified[address] = result
+        return verified
 
-    async def _analyze_address_issue_with_api(self, context: NavigationContext, address_verification: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_address_issue_with_api(self, context: NavigationContext, address_verification: Dict[str, Any]) -> Dict[str, Any]:
         """Enhanced address analysis using Google Maps API results"""
+        verified = address_verification["success"]
+        skipped = address_verification.get("status") == _MAPS_NO_KEY_STATUS
+        customer_responsive = context.customer_responsive
 
         # Determine issue type based on API verification
-        if not address_verification["success"]:
-            if "coordinates" in context.target_address.lower():
-                issue_type = "INVALID_LOCATION"
-            elif len(context.target_address.split()) < 3:
-                issue_type = "MISSING_DETAILS"
+        if skipped:
+            # Maps was never consulted, so there is no evidence the address itself is wrong
+            issue_type = None
+        elif not verified:
+            target_address = context.target_address
+            if "coordinates" in target_address.lower():
+                issue_type = AddressIssueType.INVALID_LOCATION
+            elif len(target_address.split()) < 3:
+                issue_type = AddressIssueType.MISSING_DETAILS
             else:
-                issue_type = "WRONG_PIN_CODE"
+                issue_type = AddressIssueType.WRONG_PIN_CODE
         else:
-            issue_type = "OUTDATED_INFO"  # Valid address but still can't find
+            issue_type = AddressIssueType.OUTDATED_INFO  # Valid address but still can't find
 
         # Calculate confidence based on API results
-        verification_confidence = 0.9 if address_verification["success"] else 0.1
+        verification_confidence = 0.9 if verified else 0.1
 
         # Determine correction probability
-        if address_verification["success"]:
+        if verified:
             correction_probability = 0.8
-        elif context.customer_responsive:
+        elif customer_responsive:
             correction_probability = 0.7
         else:
             correction_probability = 0.4
 
         return {
-            "ADDRESS_ISSUE_TYPE": issue_type,
+            "ADDRESS_ISSUE_TYPE": issue_type.name if issue_type is not None else None,
+            "MAPS_VERIFICATION_SKIPPED": skipped,
             "VERIFICATION_CONFIDENCE": verification_confidence,
             "CORRECTION_PROBABILITY": correction_probability,
-            "CUSTOMER_CONTACT_REQUIRED": not address_verification["success"],
-            "GPS_NAVIGATION_POSSIBLE": address_verification["success"],
+            "CUSTOMER_CONTACT_REQUIRED": not verified,
+            "GPS_NAVIGATION_POSSIBLE": verified,
             "ALTERNATIVE_PICKUP_SUGGESTED": verification_confidence < 0.5,
-            "ESTIMATED_RESOLUTION_TIME": self._estimate_resolution_time(issue_type, context.customer_responsive, verification_confidence),
+            "ESTIMATED_RESOLUTION_TIME": self._estimate_resolution_time(issue_type, customer_responsive, verification_confidence),
             "MAPS_API_DATA": address_verification,
             "RECOMMENDED_ACTIONS": self._generate_address_recommendations(issue_type, address_verification, context)
         }
 
-    def _estimate_resolution_time(self, issue_type: str, customer_responsive: bool, confidence: float) -> int:
+    def _estimate_resolution_time(self, issue_type: Optional[AddressIssueType], customer_responsive: bool, confidence: float) -> int:
         """Estimate time to resolve address issue in minutes"""
-        base_time = {
-            "WRONG_PIN_CODE": 5,
-            "MISSING_DETAILS": 8,
-            "INVALID_LOCATION": 15,
-            "OUTDATED_INFO": 10
-        }.get(issue_type, 10)
+        base_time = _BASE_RESOLUTION_TIME.get(issue_type, 10)
 
         if not customer_responsive:
             base_time += 10
@@ -670,198 +1273,98 @@ class NavigationLocationHandler:
 
         return min(base_time, 30)  # Cap at 30 minutes
 
-    def _generate_address_recommendations(self, issue_type: str, verification: Dict[str, Any], context: NavigationContext) -> List[str]:
+    def _generate_address_recommendations(self, issue_type: Optional[AddressIssueType], verification: Dict[str, Any], context: NavigationContext) -> List[str]:
         """Generate specific recommendations based on address analysis"""
-        recommendations = []
+        if issue_type is None:
+            return list(_UNVERIFIED_ADDRESS_RECOMMENDATIONS)
+        return list(_ADDRESS_RECOMMENDATIONS[(issue_type, bool(verification["success"]))])
 
-        if verification["success"]:
-            recommendations.extend([
-                "use_verified_coordinates_for_navigation",
-                "share_precise_location_with_customer",
-                "enable_gps_guided_navigation"
-            ])
-        else:
-            recommendations.extend([
-                "contact_customer_for_address_clarification",
-                "request_nearby_landmarks_or_reference_points",
-                "suggest_alternative_pickup_location"
-            ])
-
-        if issue_type == "MISSING_DETAILS":
-            recommendations.extend([
-                "request_complete_address_with_building_details",
-                "ask_for_floor_number_and_apartment_details",
-                "get_contact_person_information"
-            ])
-        elif issue_type == "INVALID_LOCATION":
-            recommendations.extend([
-                "verify_address_exists_in_maps",
-                "suggest_nearest_valid_address",
-                "coordinate_with_customer_service"
-            ])
-
-        return recommendations
-
-    async def _explore_address_alternatives_with_maps(self, context: NavigationContext, analysis: Dict[str, Any], verification: Dict[str, Any]) -> List[str]:
+    def _explore_address_alternatives_with_maps(self, context: NavigationContext, analysis: Dict[str, Any], verification: Dict[str, Any]) -> List[str]:
         """Explore alternative solutions using Maps API data"""
-        alternatives = []
+        # Slow resolutions add reassignment/pickup/refund options
+        slow_resolution = analysis.get("ESTIMATED_RESOLUTION_TIME", 15) > 20
+        return list(_ADDRESS_ALTERNATIVES[(bool(verification["success"]), slow_resolution)])
 
-        if verification["success"]:
-            # Valid address found - use GPS navigation
-            alternatives.extend([
-                "navigate_to_verified_coordinates",
-                "enable_turn_by_turn_navigation",
-                "share_live_location_with_customer"
-            ])
-        else:
-            # Invalid address - need alternatives
-            alternatives.extend([
-                "suggest_nearest_landmark_pickup",
-                "coordinate_alternative_meeting_point",
-                "escalate_to_customer_service_support"
-            ])
-
-        # Time-based alternatives
-        resolution_time = analysis.get("ESTIMATED_RESOLUTION_TIME", 15)
-        if resolution_time > 20:
-            alternatives.extend([
-                "consider_order_reassignment_to_nearby_agent",
-                "offer_customer_pickup_from_restaurant",
-                "implement_partial_refund_with_future_credit"
-            ])
-
-        return alternatives
+    def _initiate_address_correction_communication(self, context: NavigationContext, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Reach out to the customer for an address correction when Maps could not verify it"""
+        if not analysis.get("CUSTOMER_CONTACT_REQUIRED"):
+            return dict(_ADDRESS_CONTACT_NOT_REQUIRED)
+
+        template = _ADDRESS_CONTACT_RESPONSIVE if context.customer_responsive else _ADDRESS_CONTACT_UNRESPONSIVE
+        return dict(template, customer_phone=context.customer_phone)
 
     async def _execute_address_verification(self, context: NavigationContext, analysis: Dict[str, Any], verification: Dict[str, Any]) -> Dict[str, Any]:
         """Execute enhanced address verification using Maps API"""
-        verification_steps = []
+        if verification.get("status") == _MAPS_NO_KEY_STATUS:
+            return {
+                "verification_completed": False,
+                "verification_skipped": True,
+                "steps_executed": list(_ADDRESS_VERIFICATION_SKIPPED_STEPS),
+                "maps_api_integration": False,
+                "next_action_required": True
+            }
 
         if verification["success"]:
-            verification_steps.extend([
-                "google_maps_address_verified",
-                "coordinates_extracted_successfully",
-                "navigation_route_calculated"
-            ])
-
-            # Get navigation directions if coordinates available
-            if context.current_location:
+            verification_steps = list(_ADDRESS_VERIFIED_STEPS)
+
+            # Route from the agent's GPS fix when it is usable, otherwise from the reported location
+            if context.gps_valid:
+                origin = "{},{}".format(*context.gps_coordinates)
+            else:
+                origin = context.current_location
+
+            if origin:
                 try:
-                    directions = self.maps_api.get_directions(context.current_location, verification['formatted_address'])
+                    directions = await self.maps_api.get_directions_async(origin, verification['formatted_address'])
                     if directions['success']:
                         verification_steps.extend([
                             f"navigation_route_duration_{directions['duration']}",
                             f"distance_to_target_{directions['distance']}",
                             f"route_calculated_successfully"
                         ])
-                except:
+                except Exception:
+                    logger.exception("Route calculation failed for order %s", context.order_id)
                     verification_steps.append("navigation_route_calculation_failed")
         else:
-            verification_steps.extend([
-                "google_maps_verification_failed",
-                "address_not_found_in_maps_database",
-                "customer_contact_required_for_clarification"
-            ])
+            verification_steps = list(_ADDRESS_VERIFICATION_FAILED_STEPS)
 
         return {
             "verification_completed": True,
+            "verification_skipped": False,
             "steps_executed": verification_steps,
             "maps_api_integration": True,
             "next_action_required": not verification["success"]
         }
 
-    # ... [Keep all other existing methods unchanged] ...
-
-    # Common helper methods
-    async def _execute_address_verification(self, context: NavigationContext, analysis: Dict[str, Any]) -> List[str]:
-        """Execute address verification steps"""
-        actions = []
-
-        if analysis.get("CUSTOMER_COOPERATION_NEEDED") == "true":
-            customer_verification = await self._contact_customer_for_verification(context)
-            actions.append(f"customer_verification: {customer_verification}")
-
-        # Cross-reference with mapping services
-        mapping_verification = await self._verify_with_mapping_services(context)
-        actions.append(f"mapping_verification: {mapping_verification}")
-
-        # GPS coordinate validation
-        if context.gps_coordinates:
-            gps_validation = await self._validate_gps_coordinates(context.gps_coordinates, context.target_address)
-            actions.append(f"gps_validation: {gps_validation}")
-
-        return actions
-
-    async def _contact_customer_for_verification(self, context: NavigationContext) -> str:
-        """Contact customer for address verification"""
-        try:
-            # Multi-channel communication
-            communication_methods = ["call", "sms", "app_message"]
-
-            verification_message = f"""
-            Hello! I'm your delivery agent for order {context.order_id}.
-            I'm having difficulty locating your address: {context.target_address}
-
-            Could you please:
-            1. Confirm your complete address
-            2. Provide nearby landmarks
-            3. Share your live location if possible
-
-            I've been searching for {context.time_spent_searching} minutes.
-            """
-
-            await asyncio.sleep(0.1)  # Simulate communication
-            return f"customer_contacted_via_{'+'.join(communication_methods)}"
-
-        except Exception as e:
-            return f"customer_contact_failed: {str(e)}"
-
-    async def _verify_with_mapping_services(self, context: NavigationContext) -> str:
-        """Verify address with multiple mapping services"""
-        try:
-            mapping_services = ["google_maps", "apple_maps", "openstreetmap"]
-            verification_results = []
-
-            for service in mapping_services:
-                # Simulate mapping service verification
-                await asyncio.sleep(0.05)
-                verification_results.append(f"{service}_verified")
-
-            return f"verified_with_{'+'.join(verification_results)}"
-
-        except Exception as e:
-            return f"mapping_verification_failed: {str(e)}"
+    # Performance protection methods
+    def _apply_address_performance_protection(self, context: NavigationContext, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply performance protection for address issues"""
+        if analysis["MAPS_VERIFICATION_SKIPPED"]:
+            return dict(_PERF_PROTECTION_UNVERIFIED)
+
+        time_spent = context.time_spent_searching
+        return dict(
+            _PERF_PROTECTION_BASE,
+            compensation_eligible=time_spent > self.escalation_threshold,
+            time_spent_excluded_from_metrics=time_spent
+        )
 
-    async def _validate_gps_coordinates(self, coordinates: Tuple[float, float], address: str) -> str:
-        """Validate GPS coordinates against address"""
-        try:
-            lat, lon = coordinates
-            # Simulate coordinate validation
-            await asyncio.sleep(0.1)
 
-            if -90 <= lat <= 90 and -180 <= lon <= 180:
-                return f"coordinates_valid_lat_{lat}_lon_{lon}"
-            else:
-                return "coordinates_invalid_out_of_range"
+_handler_singleton: Optional[NavigationLocationHandler] = None
 
-        except Exception as e:
-            return f"coordinate_validation_failed: {str(e)}"
 
-    # Performance protection methods
-    async def _apply_address_performance_protection(self, context: NavigationContext, analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """Apply performance protection for address issues"""
-        return {
-            "delivery_time_adjustment": True,
-            "performance_score_protection": True,
-            "incident_classification": "customer_provided_incorrect_address",
-            "compensation_eligible": context.time_spent_searching > 15,
-            "time_spent_excluded_from_metrics": context.time_spent_searching
-        }
+def get_handler() -> NavigationLocationHandler:
+    """Process-wide handler, so the Maps client and database connection are reused across requests"""
+    global _handler_singleton
+    if _handler_singleton is None:
+        _handler_singleton = NavigationLocationHandler()
+    return _handler_singleton
 
 
 # Example usage
 if __name__ == "__main__":
     async def test_navigation_handler():
-        handler = NavigationLocationHandler()
+        handler = get_handler()
 
         # Test address issue
         address_context = NavigationContext(
@@ -881,4 +1384,7 @@ if __name__ == "__main__":
         result = await handler.handle_navigation_issue(address_context)
         print(f"Address issue result: {result}")
 
+        # Close this loop's pooled connections before asyncio.run() shuts the loop down
+        await handler.maps_api.aclose()
+
     asyncio.run(test_navigation_handler())
\ No newline at end of file